@@ -1,50 +1,91 @@
 import io
+import argparse
 import zstandard
 from enum import IntEnum
-from io import BytesIO
 import texture2ddecoder
 import sys
 import os
 from PIL import Image
 import struct
 import logging
-from multiprocessing import Pool, cpu_count
+import mmap
+import threading
+import atexit
+import tarfile
+import time
+from multiprocessing import cpu_count
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from functools import partial
 import numpy as np
 
+try:
+    from blake3 import blake3 as PayloadHash
+except ImportError:
+    from hashlib import blake2b as PayloadHash
+
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
-class BinaryReader(BytesIO):
+CharStruct = struct.Struct("<b")
+UcharStruct = struct.Struct("<B")
+ShortStruct = struct.Struct("<h")
+UshortStruct = struct.Struct("<H")
+IntStruct = struct.Struct("<i")
+UintStruct = struct.Struct("<I")
+
+
+class BinaryReader:
     def __init__(self, InitialBytes: bytes) -> None:
-        super().__init__(InitialBytes)
+        self.Buffer = InitialBytes
+        self.Position = 0
+
+    def read(self, Size: int = -1):
+        Start = self.Position
+        self.Position = len(self.Buffer) if Size < 0 else min(Start + Size, len(self.Buffer))
+        return self.Buffer[Start:self.Position]
+
+    def tell(self):
+        return self.Position
 
     def Skip(self, Size: int):
-        self.read(Size)
+        self.Position = min(self.Position + Size, len(self.Buffer))
 
     def ReadBool(self):
         return self.ReadUchar() >= 1
 
     def ReadChar(self):
-        return int.from_bytes(self.read(1), "little", signed=True)
+        Value, = CharStruct.unpack_from(self.Buffer, self.Position)
+        self.Position += 1
+        return Value
 
     def ReadUchar(self):
-        return int.from_bytes(self.read(1), "little", signed=False)
+        Value, = UcharStruct.unpack_from(self.Buffer, self.Position)
+        self.Position += 1
+        return Value
 
     def ReadShort(self):
-        return int.from_bytes(self.read(2), "little", signed=True)
+        Value, = ShortStruct.unpack_from(self.Buffer, self.Position)
+        self.Position += 2
+        return Value
 
     def ReadUshort(self):
-        return int.from_bytes(self.read(2), "little", signed=False)
+        Value, = UshortStruct.unpack_from(self.Buffer, self.Position)
+        self.Position += 2
+        return Value
 
     def ReadInt(self):
-        return int.from_bytes(self.read(4), "little", signed=True)
+        Value, = IntStruct.unpack_from(self.Buffer, self.Position)
+        self.Position += 4
+        return Value
     
     def ReadUint(self):
-        return int.from_bytes(self.read(4), "little", signed=False)
+        Value, = UintStruct.unpack_from(self.Buffer, self.Position)
+        self.Position += 4
+        return Value
 
     def ReadAscii(self):
         Size = self.ReadUchar()
         if Size != 0xFF:
-            return self.read(Size).decode('utf8')
+            return str(self.read(Size), 'utf8')
         return None
 
     def ReadTwip(self):
@@ -141,6 +182,60 @@ class ScPixel(IntEnum):
     RGBA8Unorm_70 = 70
 
 
+ScPixelValues = ScPixel._value2member_map_
+
+
+ZstdFrameHeaderSizeMax = 18
+
+DecompressorLocal = threading.local()
+
+
+def GetDecompressor() -> zstandard.ZstdDecompressor:
+    # ZstdDecompressor is reusable but not thread safe, so keep one per thread.
+    Dctx = getattr(DecompressorLocal, "Dctx", None)
+    if Dctx is None:
+        Dctx = DecompressorLocal.Dctx = zstandard.ZstdDecompressor()
+    return Dctx
+
+
+def DecompressZstd(Data, MaxOutputSize: int = 0) -> bytes:
+    Dctx = GetDecompressor()
+    
+    # With the content size in the frame header python-zstandard allocates the exact
+    # output buffer up front; only frames without it need a size hint or streaming.
+    if zstandard.frame_content_size(Data) >= 0:
+        return Dctx.decompress(Data)
+    if MaxOutputSize > 0:
+        return Dctx.decompress(Data, max_output_size=MaxOutputSize)
+    return Dctx.decompressobj().decompress(Data)
+
+
+AstcFormatIds = frozenset(range(186, 201)) | frozenset(range(204, 219))
+
+AstcIdToName = {
+    186: "ASTC_SRGBA8_4x4", 187: "ASTC_SRGBA8_5x4", 188: "ASTC_SRGBA8_5x5",
+    189: "ASTC_SRGBA8_6x5", 190: "ASTC_SRGBA8_6x6", 192: "ASTC_SRGBA8_8x5",
+    193: "ASTC_SRGBA8_8x6", 194: "ASTC_SRGBA8_8x8", 195: "ASTC_SRGBA8_10x5",
+    196: "ASTC_SRGBA8_10x6", 197: "ASTC_SRGBA8_10x8", 198: "ASTC_SRGBA8_10x10",
+    199: "ASTC_SRGBA8_12x10", 200: "ASTC_SRGBA8_12x12", 204: "ASTC_RGBA8_4x4",
+    205: "ASTC_RGBA8_5x4", 206: "ASTC_RGBA8_5x5", 207: "ASTC_RGBA8_6x5",
+    208: "ASTC_RGBA8_6x6", 210: "ASTC_RGBA8_8x5", 211: "ASTC_RGBA8_8x6",
+    212: "ASTC_RGBA8_8x8", 213: "ASTC_RGBA8_10x5", 214: "ASTC_RGBA8_10x6",
+    215: "ASTC_RGBA8_10x8", 216: "ASTC_RGBA8_10x10", 217: "ASTC_RGBA8_12x10",
+    218: "ASTC_RGBA8_12x12"
+}
+
+AstcBlockSizes = {
+    FormatId: tuple(int(Size) for Size in Name.rsplit("_", 1)[1].split("x"))
+    for FormatId, Name in AstcIdToName.items()
+}
+
+UncompressedFormats = ("R8", "R16", "R16F", "R32F", "RG8", "RG16", "RG16F", "RG32F", 
+                       "RGB8", "RGB16", "RGB16F", "RGB32F", "RGBA8", "RGBA16", "RGBA16F", 
+                       "RGBA32F", "BGR8", "BGRA8", "RGBA8Unorm", "RGB8Unorm", "RG8Unorm", 
+                       "R8Unorm", "BGRA8Unorm", "BGR8Unorm")
+
+
 class Texture:
     def __init__(self, Pixel: ScPixel, Width: int = 0, Height: int = 0) -> None:
         self.Width = Width
@@ -151,42 +246,32 @@ class Texture:
         self.IsCompressedDataFlag = None
         self.DecompressedData = None
         
-    def GetFormatName(self):
+        FormatName = self.FormatName = self.ResolveFormatName()
+        self.IsAstcFlag = "ASTC" in FormatName
+        self.IsEtcFlag = "ETC" in FormatName or "EAC" in FormatName
+        self.IsSrgbFlag = "SRGB" in FormatName or "sRGB" in FormatName
+        self.IsPvrtcFlag = "PVRTC" in FormatName
+        self.IsUncompressedFlag = (not (self.IsAstcFlag or self.IsEtcFlag or self.IsPvrtcFlag)
+                                   and any(Fmt in FormatName for Fmt in UncompressedFormats))
+        
+    def ResolveFormatName(self):
         if isinstance(self.PixelType, ScPixel):
             if self.PixelType == ScPixel.RGBA8Unorm_70:
                 return "RGBA8Unorm"
             return self.PixelType.name
         else:
-            AstcFormatIds = list(range(186, 201)) + list(range(204, 219))
             if self.PixelType in AstcFormatIds:
-                AstcIdToName = {
-                    186: "ASTC_SRGBA8_4x4", 187: "ASTC_SRGBA8_5x4", 188: "ASTC_SRGBA8_5x5",
-                    189: "ASTC_SRGBA8_6x5", 190: "ASTC_SRGBA8_6x6", 192: "ASTC_SRGBA8_8x5",
-                    193: "ASTC_SRGBA8_8x6", 194: "ASTC_SRGBA8_8x8", 195: "ASTC_SRGBA8_10x5",
-                    196: "ASTC_SRGBA8_10x6", 197: "ASTC_SRGBA8_10x8", 198: "ASTC_SRGBA8_10x10",
-                    199: "ASTC_SRGBA8_12x10", 200: "ASTC_SRGBA8_12x12", 204: "ASTC_RGBA8_4x4",
-                    205: "ASTC_RGBA8_5x4", 206: "ASTC_RGBA8_5x5", 207: "ASTC_RGBA8_6x5",
-                    208: "ASTC_RGBA8_6x6", 210: "ASTC_RGBA8_8x5", 211: "ASTC_RGBA8_8x6",
-                    212: "ASTC_RGBA8_8x8", 213: "ASTC_RGBA8_10x5", 214: "ASTC_RGBA8_10x6",
-                    215: "ASTC_RGBA8_10x8", 216: "ASTC_RGBA8_10x10", 217: "ASTC_RGBA8_12x10",
-                    218: "ASTC_RGBA8_12x12"
-                }
                 return AstcIdToName.get(self.PixelType, f"ASTC_UNKNOWN_{self.PixelType}")
             
             if self.PixelType == 70:
                 return "RGBA8Unorm"
             return f"UNKNOWN ({self.PixelType})"
             
+    def GetFormatName(self):
+        return self.FormatName
+            
     def IsAstc(self):
-        FormatName = self.GetFormatName()
-        if "ASTC" in FormatName:
-            return True
-        
-        AstcFormatIds = list(range(186, 201)) + list(range(204, 219))
-        if hasattr(self.PixelType, 'value'):
-            return self.PixelType.value in AstcFormatIds
-        else:
-            return self.PixelType in AstcFormatIds
+        return self.IsAstcFlag
         
     def IsCompressedData(self):
         if self.IsCompressedDataFlag is not None:
@@ -196,21 +281,8 @@ class Texture:
             self.IsCompressedDataFlag = False
             return False
         
-        if self.Data[:4] == b'\x28\xb5\x2f\xfd':
-            self.IsCompressedDataFlag = True
-            return True
-        
-        try:
-            Dctx = zstandard.ZstdDecompressor()
-            TestData = self.Data[:min(100, len(self.Data))]
-            Dctx.decompress(TestData, max_output_size=1000)
-            self.IsCompressedDataFlag = True
-            return True
-        except:
-            pass
-        
-        self.IsCompressedDataFlag = False
-        return False
+        self.IsCompressedDataFlag = self.Data[:4] == b'\x28\xb5\x2f\xfd'
+        return self.IsCompressedDataFlag
         
     def DecompressData(self):
         if self.DecompressedData is not None:
@@ -221,12 +293,11 @@ class Texture:
             return self.Data
             
         try:
-            Dctx = zstandard.ZstdDecompressor()
             MaxExpected = self.CalculateExpectedSize() * 3
             if MaxExpected == 0:
                 MaxExpected = 100 * 1024 * 1024
                 
-            self.DecompressedData = Dctx.decompress(self.Data, max_output_size=MaxExpected)
+            self.DecompressedData = DecompressZstd(self.Data, MaxExpected)
             logging.info(f"Successfully decompressed: {len(self.Data)} -> {len(self.DecompressedData)} bytes")
             return self.DecompressedData
         except Exception as E:
@@ -234,28 +305,16 @@ class Texture:
             return self.Data
         
     def IsEtc(self):
-        FormatName = self.GetFormatName()
-        return "ETC" in FormatName or "EAC" in FormatName
+        return self.IsEtcFlag
         
     def IsSrgb(self):
-        FormatName = self.GetFormatName()
-        return "SRGB" in FormatName or "SRGBA" in FormatName or "sRGB" in FormatName
+        return self.IsSrgbFlag
         
     def IsPvrtc(self):
-        FormatName = self.GetFormatName()
-        return "PVRTC" in FormatName
+        return self.IsPvrtcFlag
         
     def IsUncompressed(self):
-        FormatName = self.GetFormatName()
-        UncompressedFormats = ["R8", "R16", "R16F", "R32F", "RG8", "RG16", "RG16F", "RG32F", 
-                                "RGB8", "RGB16", "RGB16F", "RGB32F", "RGBA8", "RGBA16", "RGBA16F", 
-                                "RGBA32F", "BGR8", "BGRA8", "RGBA8Unorm", "RGB8Unorm", "RG8Unorm", 
-                                "R8Unorm", "BGRA8Unorm", "BGR8Unorm"]
-        
-        if self.IsAstc() or self.IsEtc() or self.IsPvrtc():
-            return False
-            
-        return any(Fmt in FormatName for Fmt in UncompressedFormats)
+        return self.IsUncompressedFlag
     
     def CalculateExpectedSize(self):
         if self.Width == 0 or self.Height == 0:
@@ -264,18 +323,12 @@ class Texture:
         FormatName = self.GetFormatName()
         
         if self.IsAstc():
-            AstcBlockSizes = {
-                "4x4": (4, 4), "5x4": (5, 4), "5x5": (5, 5), "6x5": (6, 5),
-                "6x6": (6, 6), "8x5": (8, 5), "8x6": (8, 6), "8x8": (8, 8),
-                "10x5": (10, 5), "10x6": (10, 6), "10x8": (10, 8), "10x10": (10, 10),
-                "12x10": (12, 10), "12x12": (12, 12)
-            }
-            
-            for BlockPattern, (Bw, Bh) in AstcBlockSizes.items():
-                if BlockPattern in FormatName:
-                    BlocksX = (self.Width + Bw - 1) // Bw
-                    BlocksY = (self.Height + Bh - 1) // Bh
-                    return BlocksX * BlocksY * 16
+            BlockSize = AstcBlockSizes.get(self.PixelType)
+            if BlockSize:
+                Bw, Bh = BlockSize
+                BlocksX = (self.Width + Bw - 1) // Bw
+                BlocksY = (self.Height + Bh - 1) // Bh
+                return BlocksX * BlocksY * 16
         
         elif self.IsEtc():
             BlocksX = (self.Width + 3) // 4
@@ -298,6 +351,136 @@ class Texture:
         return 0
 
 
+def PixelArray(Data, Width: int, Height: int, Channels: int):
+    return np.frombuffer(Data, dtype=np.uint8, count=Width * Height * Channels).reshape(Height, Width, Channels)
+
+
+def DecodeR8(Data, Width: int, Height: int):
+    return np.repeat(PixelArray(Data, Width, Height, 1), 3, axis=2), 'RGB', 'RGB'
+
+
+def DecodeRg8(Data, Width: int, Height: int):
+    Rgb = np.zeros((Height, Width, 3), dtype=np.uint8)
+    Rgb[..., :2] = PixelArray(Data, Width, Height, 2)
+    return Rgb, 'RGB', 'RGB'
+
+
+def BgraDecoder(Decode):
+    return lambda Data, Width, Height: (Decode(Data, Width, Height), 'RGBA', 'BGRA')
+
+
+def RawPixels(Mode: str, RawMode: str):
+    return lambda Data, Width, Height: (Data, Mode, RawMode)
+
+
+def DecodeAstcTexture(Data, Width: int, Height: int, BlockWidth: int, BlockHeight: int):
+    return texture2ddecoder.decode_astc(Data, Width, Height, BlockWidth, BlockHeight), 'RGBA', 'BGRA'
+
+
+def DecodePvrtc(Data, Width: int, Height: int, Is2Bpp: bool):
+    return texture2ddecoder.decode_pvrtc(Data, Width, Height, Is2Bpp), 'RGBA', 'BGRA'
+
+
+def DecodeEacR(Data, Width: int, Height: int, Signed: bool):
+    Decode = texture2ddecoder.decode_eacr_signed if Signed else texture2ddecoder.decode_eacr
+    BgraData = bytearray(Decode(Data, Width, Height))
+    Intensity = BgraData[2::4]
+    BgraData[0::4] = Intensity
+    BgraData[1::4] = Intensity
+    return BgraData, 'RGBA', 'RGBA'
+
+
+def DecodeRgbaUnorm(Data, Width: int, Height: int):
+    logging.info("RGBA8Unorm: treating as BGRA (no conversion)")
+    return Data, 'RGBA', 'RGBA'
+
+
+ScratchLocal = threading.local()
+
+
+def GetScratch(Count: int, DataType):
+    # Intermediates only: the buffer is reused by this thread's next decode, so
+    # nothing handed to PIL may point into it.
+    Size = Count * np.dtype(DataType).itemsize
+    Scratch = getattr(ScratchLocal, "Buffer", None)
+    if Scratch is None or len(Scratch) < Size:
+        Scratch = ScratchLocal.Buffer = bytearray(Size)
+    return np.frombuffer(Scratch, dtype=DataType, count=Count)
+
+
+def DecodeFloat(Data, Width: int, Height: int, DataType: str, Channels: int):
+    Values = np.frombuffer(Data, dtype=DataType, count=Width * Height * Channels).reshape(Height, Width, Channels)
+    Scaled = GetScratch(Values.size, np.float32).reshape(Values.shape)
+    Scaled[...] = Values
+    np.nan_to_num(Scaled, copy=False)
+    np.clip(Scaled, 0.0, 1.0, out=Scaled)
+    Scaled *= 255.0
+    Scaled += 0.5
+    Pixels = Scaled.astype(np.uint8)
+    
+    if Channels == 1:
+        return DecodeR8(Pixels, Width, Height)
+    if Channels == 2:
+        return DecodeRg8(Pixels, Width, Height)
+    if Channels == 3:
+        return Pixels, 'RGB', 'RGB'
+    return Pixels, 'RGBA', 'BGRA'
+
+
+TextureDecoders = {
+    ScPixel.EAC_R11: partial(DecodeEacR, Signed=False),
+    ScPixel.EAC_SIGNED_R11: partial(DecodeEacR, Signed=True),
+    ScPixel.EAC_RG11: BgraDecoder(texture2ddecoder.decode_eacrg),
+    ScPixel.EAC_SIGNED_RG11: BgraDecoder(texture2ddecoder.decode_eacrg_signed),
+    ScPixel.ETC2_EAC_RGBA8: BgraDecoder(texture2ddecoder.decode_etc2a8),
+    ScPixel.ETC2_EAC_SRGBA8: BgraDecoder(texture2ddecoder.decode_etc2a8),
+    ScPixel.ETC2_RGB8: BgraDecoder(texture2ddecoder.decode_etc2),
+    ScPixel.ETC2_SRGB8: BgraDecoder(texture2ddecoder.decode_etc2),
+    ScPixel.ETC2_RGB8_PUNCHTHROUGH_ALPHA1: BgraDecoder(texture2ddecoder.decode_etc2a1),
+    ScPixel.ETC2_SRGB8_PUNCHTHROUGH_ALPHA1: BgraDecoder(texture2ddecoder.decode_etc2a1),
+    ScPixel.ETC1_RGB8: BgraDecoder(texture2ddecoder.decode_etc1),
+    ScPixel.R8: DecodeR8,
+    ScPixel.R8_SIGNED: DecodeR8,
+    ScPixel.R8Unorm: DecodeR8,
+    ScPixel.R16F: partial(DecodeFloat, DataType='<f2', Channels=1),
+    ScPixel.R32F: partial(DecodeFloat, DataType='<f4', Channels=1),
+    ScPixel.RG8: DecodeRg8,
+    ScPixel.RG8_SIGNED: DecodeRg8,
+    ScPixel.RG8Unorm: DecodeRg8,
+    ScPixel.RG16F: partial(DecodeFloat, DataType='<f2', Channels=2),
+    ScPixel.RG32F: partial(DecodeFloat, DataType='<f4', Channels=2),
+    ScPixel.RGB8: RawPixels('RGB', 'RGB'),
+    ScPixel.RGB8_SIGNED: RawPixels('RGB', 'RGB'),
+    ScPixel.RGB8Unorm: RawPixels('RGB', 'RGB'),
+    ScPixel.RGB8Unorm_sRGB: RawPixels('RGB', 'RGB'),
+    ScPixel.RGB16F: partial(DecodeFloat, DataType='<f2', Channels=3),
+    ScPixel.RGB32F: partial(DecodeFloat, DataType='<f4', Channels=3),
+    ScPixel.RGBA8: RawPixels('RGBA', 'BGRA'),
+    ScPixel.RGBA8_SIGNED: RawPixels('RGBA', 'BGRA'),
+    ScPixel.RGBA8Unorm: DecodeRgbaUnorm,
+    ScPixel.RGBA8Unorm_sRGB: DecodeRgbaUnorm,
+    ScPixel.RGBA8Unorm_70: DecodeRgbaUnorm,
+    ScPixel.RGBA16F: partial(DecodeFloat, DataType='<f2', Channels=4),
+    ScPixel.RGBA32F: partial(DecodeFloat, DataType='<f4', Channels=4),
+    ScPixel.BGR8: RawPixels('RGB', 'BGR'),
+    ScPixel.BGR8Unorm: RawPixels('RGB', 'BGR'),
+    ScPixel.BGRA8: RawPixels('RGBA', 'RGBA'),
+    ScPixel.BGRA8_SRGB: RawPixels('RGBA', 'RGBA'),
+    ScPixel.BGRA8Unorm: RawPixels('RGBA', 'RGBA'),
+}
+
+for PvrtcPixel in ScPixel:
+    if PvrtcPixel.name.startswith("PVRTC"):
+        TextureDecoders[PvrtcPixel] = partial(DecodePvrtc, Is2Bpp=PvrtcPixel.name.endswith("2"))
+
+for FormatId, (BlockWidth, BlockHeight) in AstcBlockSizes.items():
+    TextureDecoders[ScPixel(FormatId)] = partial(DecodeAstcTexture, BlockWidth=BlockWidth, BlockHeight=BlockHeight)
+
+
+class SCTXParseError(Exception):
+    pass
+
+
 class SCTX:
     def __init__(self, Filepath: str, StreamingIdOverride: int = 0xFF) -> None:
         self.Width = 0
@@ -307,78 +490,120 @@ class SCTX:
         self.StreamingTexture: Texture = None
         self.Texture: Texture = None
         self.OriginalFileData = None
+        self.FileMap = None
         self.CompressedPayload = None
+        self.PayloadOffset = -1
         self.DecompressedPayload = None
+        self.PayloadDecompressed = False
+        self.TextureDataOffset = -1
         
-        FileSize = os.path.getsize(Filepath)
+        # The mapping stays open for as long as any slice of it (texture data,
+        # payload) is still referenced, so the kernel only pages in what is read.
+        Fd = os.open(Filepath, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            FileSize = os.fstat(Fd).st_size
+            if FileSize > 0:
+                self.FileMap = mmap.mmap(Fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(Fd)
+        self.OriginalFileData = self.FileMap if self.FileMap is not None else b""
         
-        with open(Filepath, "rb") as F:
-            self.OriginalFileData = F.read()
+        self.FindPayload()
         
-        self.FindAndDecompressPayload()
+        if FileSize < 4:
+            logging.warning(f"File too small to contain a header: {FileSize} bytes")
+            return
         
-        Reader = BinaryReader(self.OriginalFileData)
+        try:
+            FileData = memoryview(self.OriginalFileData)
         
-        StreamingLength = Reader.ReadUint()
-        if StreamingLength > len(self.OriginalFileData) - Reader.tell():
-            logging.warning(f"Invalid streaming length {StreamingLength}")
-            StreamingLength = min(StreamingLength, len(self.OriginalFileData) - Reader.tell())
+            StreamingLength, = UintStruct.unpack_from(FileData, 0)
+            Position = 4
+            if StreamingLength > FileSize - Position:
+                logging.warning(f"Invalid streaming length {StreamingLength}")
+                StreamingLength = FileSize - Position
         
-        StreamingData = Reader.read(StreamingLength)
-        self.ReadStreamingData(StreamingData)
+            self.ReadStreamingData(FileData[Position:Position + StreamingLength])
+            Position += StreamingLength
         
-        if Reader.tell() < len(self.OriginalFileData) - 4:
-            DataLength = Reader.ReadUint()
-            if DataLength > len(self.OriginalFileData) - Reader.tell():
-                logging.warning(f"Invalid data length {DataLength}")
-                DataLength = min(DataLength, len(self.OriginalFileData) - Reader.tell())
+            if Position < FileSize - 4:
+                DataLength, = UintStruct.unpack_from(FileData, Position)
+                Position += 4
+                if DataLength > FileSize - Position:
+                    logging.warning(f"Invalid data length {DataLength}")
+                    DataLength = FileSize - Position
             
-            Data = Reader.read(DataLength)
-            self.ReadTexture(Data)
+                self.ReadTexture(FileData[Position:Position + DataLength])
+                Position += DataLength
             
-            if self.Texture and self.Texture.DataLength > 0:
-                if Reader.tell() + self.Texture.DataLength <= len(self.OriginalFileData):
-                    self.Texture.Data = Reader.read(self.Texture.DataLength)
-                else:
-                    logging.warning(f"Texture data length {self.Texture.DataLength} exceeds file size")
-                    Remaining = len(self.OriginalFileData) - Reader.tell()
-                    if Remaining > 0:
-                        self.Texture.Data = Reader.read(Remaining)
+                if self.Texture and self.Texture.DataLength > 0:
+                    if Position + self.Texture.DataLength <= FileSize:
+                        self.Texture.Data = FileData[Position:Position + self.Texture.DataLength]
+                        self.TextureDataOffset = Position
+                    else:
+                        logging.warning(f"Texture data length {self.Texture.DataLength} exceeds file size")
+                        if FileSize > Position:
+                            self.Texture.Data = FileData[Position:]
+                            self.TextureDataOffset = Position
+        except struct.error as E:
+            raise SCTXParseError(f"Malformed SCTX layout: {E}") from E
         
         if self.Texture and (not self.Texture.Data or len(self.Texture.Data) < 16):
             logging.info("Main texture data is too small, checking streaming texture...")
             if self.StreamingTexture and self.StreamingTexture.Data:
                 logging.info("Using streaming texture data instead")
                 self.Texture.Data = self.StreamingTexture.Data
+                self.TextureDataOffset = -1
                 self.Texture.DataLength = self.StreamingTexture.DataLength
 
-    def FindAndDecompressPayload(self):
+    def FindPayload(self):
         ZstdMagic = b'\x28\xb5\x2f\xfd'
         
-        for Offset in [0, 512, 536, 584, 768, 1024]:
-            if Offset < len(self.OriginalFileData) - 4:
-                Chunk = self.OriginalFileData[Offset:Offset+4]
-                if Chunk == ZstdMagic:
-                    logging.info(f"Found Zstd compressed data at offset {Offset}")
-                    self.CompressedPayload = self.OriginalFileData[Offset:]
-                    try:
-                        Dctx = zstandard.ZstdDecompressor()
-                        self.DecompressedPayload = Dctx.decompress(self.CompressedPayload)
-                        logging.info(f"Decompressed payload: {len(self.CompressedPayload)} -> {len(self.DecompressedPayload)} bytes")
-                        return
-                    except Exception as E:
-                        logging.error(f"Failed to decompress payload: {E}")
-        
         Pos = self.OriginalFileData.find(ZstdMagic)
-        if Pos != -1:
-            logging.info(f"Found Zstd compressed data at offset {Pos}")
-            self.CompressedPayload = self.OriginalFileData[Pos:]
+        while Pos != -1:
+            # The magic can occur by chance inside texture bytes; only accept it
+            # when a valid frame header follows.
             try:
-                Dctx = zstandard.ZstdDecompressor()
-                self.DecompressedPayload = Dctx.decompress(self.CompressedPayload)
-                logging.info(f"Decompressed payload: {len(self.CompressedPayload)} -> {len(self.DecompressedPayload)} bytes")
-            except Exception as E:
-                logging.error(f"Failed to decompress payload: {E}")
+                zstandard.get_frame_parameters(self.OriginalFileData[Pos:Pos + ZstdFrameHeaderSizeMax])
+            except zstandard.ZstdError:
+                Pos = self.OriginalFileData.find(ZstdMagic, Pos + 4)
+                continue
+            
+            logging.info(f"Found Zstd compressed data at offset {Pos}")
+            self.PayloadOffset = Pos
+            self.CompressedPayload = memoryview(self.OriginalFileData)[Pos:]
+            return
+    
+    def NeedsDecompressedPayload(self):
+        # Decompresses the texture's own data (cached on the Texture) to compare it
+        # against the format's expected size, so this is not a cheap check.
+        TextureObj = self.Texture or self.StreamingTexture
+        if not TextureObj or not TextureObj.Data:
+            return True
+        
+        TextureData = TextureObj.DecompressData()
+        if not TextureData or len(TextureData) < 16:
+            return True
+        return len(TextureData) < TextureObj.CalculateExpectedSize()
+    
+    def GetDecompressedPayload(self):
+        if self.PayloadDecompressed or self.CompressedPayload is None:
+            return self.DecompressedPayload
+        self.PayloadDecompressed = True
+        
+        # When the payload frame is the texture's own data, reuse that decompression.
+        if self.Texture and self.TextureDataOffset == self.PayloadOffset and self.Texture.IsCompressedData():
+            TextureData = self.Texture.DecompressData()
+            if TextureData is not self.Texture.Data:
+                self.DecompressedPayload = TextureData
+                return self.DecompressedPayload
+        
+        try:
+            self.DecompressedPayload = DecompressZstd(self.CompressedPayload)
+            logging.info(f"Decompressed payload: {len(self.CompressedPayload)} -> {len(self.DecompressedPayload)} bytes")
+        except Exception as E:
+            logging.error(f"Failed to decompress payload: {E}")
+        return self.DecompressedPayload
     
     def ReadStreamingData(self, Data: bytes):
         if len(Data) < 4:
@@ -399,21 +624,12 @@ class SCTX:
         Height = Reader.ReadUshort()
         Reader.ReadInt()
 
-        AstcFormatIds = list(range(186, 201)) + list(range(204, 219))
+        Pixel = ScPixelValues.get(PixelType)
         if PixelType in AstcFormatIds:
             logging.info(f"Detected ASTC format: ID {PixelType}")
-            try:
-                self.Texture = Texture(ScPixel(PixelType), Width, Height)
-            except ValueError:
-                self.Texture = Texture(PixelType, Width, Height)
-        elif PixelType == 70:
-            self.Texture = Texture(ScPixel.RGBA8Unorm_70, Width, Height)
-        else:
-            try:
-                self.Texture = Texture(ScPixel(PixelType), Width, Height)
-            except ValueError:
-                logging.warning(f"Unknown pixel format detected: {PixelType}")
-                self.Texture = Texture(PixelType, Width, Height)
+        elif Pixel is None:
+            logging.warning(f"Unknown pixel format detected: {PixelType}")
+        self.Texture = Texture(Pixel if Pixel is not None else PixelType, Width, Height)
                 
         if len(Data) - Reader.tell() >= 4:
             self.Texture.DataLength = Reader.ReadUint()
@@ -441,19 +657,8 @@ class SCTX:
         PixelType = Reader.ReadUint()
         Reader.ReadInt()
 
-        AstcFormatIds = list(range(186, 201)) + list(range(204, 219))
-        if PixelType in AstcFormatIds:
-            try:
-                self.StreamingTexture = Texture(ScPixel(PixelType), Width, Height)
-            except ValueError:
-                self.StreamingTexture = Texture(PixelType, Width, Height)
-        elif PixelType == 70:
-            self.StreamingTexture = Texture(ScPixel.RGBA8Unorm_70, Width, Height)
-        else:
-            try:
-                self.StreamingTexture = Texture(ScPixel(PixelType), Width, Height)
-            except ValueError:
-                self.StreamingTexture = Texture(PixelType, Width, Height)
+        Pixel = ScPixelValues.get(PixelType)
+        self.StreamingTexture = Texture(Pixel if Pixel is not None else PixelType, Width, Height)
             
         if len(Data) - Reader.tell() >= 4:
             self.StreamingTexture.DataLength = Reader.ReadUint()
@@ -461,7 +666,7 @@ class SCTX:
                 self.StreamingTexture.Data = Reader.read(self.StreamingTexture.DataLength)
         
     def ReadTexture(self, Data: bytes):
-        if len(Data) < 24 + 10:
+        if self.Texture is None or len(Data) < 24 + 10:
             return
             
         Reader = BinaryReader(Data)
@@ -474,9 +679,12 @@ class SCTX:
         if len(Data) - Reader.tell() >= 4:
             HashLength = Reader.ReadUint()
             if HashLength > 0 and len(Data) - Reader.tell() >= HashLength:
-                HashData = Reader.read(HashLength)
+                Reader.Skip(HashLength)
 
     def LogInfo(self):
+        if not logging.getLogger().isEnabledFor(logging.INFO):
+            return
+        
         if self.Texture:
             ExpectedSize = self.Texture.CalculateExpectedSize()
             print(f"\nMain Texture:")
@@ -499,7 +707,7 @@ class SCTX:
             logging.info(f"   Expected Size: {ExpectedSize} bytes")
 
     def DecodeTexture(self, TextureObj: Texture, UseDecompressedPayload: bool = False):
-        if UseDecompressedPayload and self.DecompressedPayload:
+        if UseDecompressedPayload and self.GetDecompressedPayload():
             logging.info("Using decompressed payload for decoding")
             TextureData = self.DecompressedPayload
         elif TextureObj.Data:
@@ -508,270 +716,393 @@ class SCTX:
                 TextureData = TextureObj.DecompressData()
         else:
             logging.error("No texture data available")
-            return None, None
+            return None, None, None
             
         if not TextureData or len(TextureData) < 16:
             logging.error(f"Texture data too small: {len(TextureData) if TextureData else 0} bytes")
-            return None, None
+            return None, None, None
         
-        Width = TextureObj.Width
-        Height = TextureObj.Height
-        FormatName = TextureObj.GetFormatName()
+        Decoder = TextureDecoders.get(TextureObj.PixelType)
+        if Decoder is None:
+            logging.error(f"Unsupported texture format: {TextureObj.GetFormatName()}")
+            return None, None, None
         
         try:
-            if TextureObj.IsAstc():
-                import re
-                Match = re.search(r'(\d+)x(\d+)', FormatName)
-                if Match:
-                    BlockWidth = int(Match.group(1))
-                    BlockHeight = int(Match.group(2))
-                    RgbaData = texture2ddecoder.decode_astc(TextureData, Width, Height, BlockWidth, BlockHeight)
-                    BgraData = bytearray()
-                    for I in range(0, len(RgbaData), 4):
-                        R, G, B, A = RgbaData[I:I+4]
-                        BgraData.extend([B, G, R, A])
-                    return bytes(BgraData), 'RGBA'
-    
-            elif TextureObj.IsEtc():
-                if "ETC1" in FormatName or "ETC2_RGB8" in FormatName or "ETC2_SRGB8" in FormatName:
-                    RgbaData = texture2ddecoder.decode_etc1(TextureData, Width, Height)
-                    BgraData = bytearray()
-                    for I in range(0, len(RgbaData), 4):
-                        R, G, B, A = RgbaData[I:I+4]
-                        BgraData.extend([B, G, R, A])
-                    return bytes(BgraData), 'RGBA'
-                elif "ETC2_EAC_RGBA8" in FormatName or "ETC2_EAC_SRGBA8" in FormatName:
-                    RgbaData = texture2ddecoder.decode_etc2(TextureData, Width, Height)
-                    BgraData = bytearray()
-                    for I in range(0, len(RgbaData), 4):
-                        R, G, B, A = RgbaData[I:I+4]
-                        BgraData.extend([B, G, R, A])
-                    return bytes(BgraData), 'RGBA'
-                elif "ETC2_RGB8_PUNCHTHROUGH_ALPHA1" in FormatName or "ETC2_SRGB8_PUNCHTHROUGH_ALPHA1" in FormatName:
-                    RgbaData = texture2ddecoder.decode_etc2a1(TextureData, Width, Height)
-                    BgraData = bytearray()
-                    for I in range(0, len(RgbaData), 4):
-                        R, G, B, A = RgbaData[I:I+4]
-                        BgraData.extend([B, G, R, A])
-                    return bytes(BgraData), 'RGBA'
-                elif "EAC_R11" in FormatName or "EAC_SIGNED_R11" in FormatName:
-                    MonoData = texture2ddecoder.decode_eacr(TextureData, Width, Height, signed=("SIGNED" in FormatName))
-                    BgraData = bytearray()
-                    for Intensity in MonoData:
-                        BgraData.extend([Intensity, Intensity, Intensity, 255])
-                    return bytes(BgraData), 'RGBA'
-                elif "EAC_RG11" in FormatName or "EAC_SIGNED_RG11" in FormatName:
-                    RgData = texture2ddecoder.decode_eacrg(TextureData, Width, Height, signed=("SIGNED" in FormatName))
-                    BgraData = bytearray()
-                    for I in range(0, len(RgData), 2):
-                        R, G = RgData[I:I+2]
-                        BgraData.extend([0, G, R, 255])
-                    return bytes(BgraData), 'RGBA'
-    
-            elif TextureObj.IsUncompressed():
-               
-                if "RGBA8Unorm" in FormatName:
-                    logging.info("RGBA8Unorm: treating as BGRA (no conversion)")
-                    
-                    return TextureData, 'RGBA'
-                elif "RGBA8" in FormatName and "Unorm" not in FormatName:
-                    
-                    BgraData = bytearray()
-                    for I in range(0, len(TextureData), 4):
-                        R, G, B, A = TextureData[I:I+4]
-                        BgraData.extend([B, G, R, A])
-                    return bytes(BgraData), 'RGBA'
-                elif "BGRA8" in FormatName or "BGRA8Unorm" in FormatName or "BGRA8_SRGB" in FormatName:
-                    
-                    return TextureData, 'RGBA'
-                elif "RGB8" in FormatName or "RGB8Unorm" in FormatName or "RGB8_SRGB" in FormatName or "RGB8Unorm_sRGB" in FormatName:
-                    RgbData = bytearray()
-                    for I in range(0, len(TextureData), 3):
-                        R, G, B = TextureData[I:I+3]
-                        RgbData.extend([R, G, B])
-                    return bytes(RgbData), 'RGB'
-                elif "BGR8" in FormatName or "BGR8Unorm" in FormatName:
-                    RgbData = bytearray()
-                    for I in range(0, len(TextureData), 3):
-                        B, G, R = TextureData[I:I+3]
-                        RgbData.extend([R, G, B])
-                    return bytes(RgbData), 'RGB'
-                elif "RG8" in FormatName or "RG8Unorm" in FormatName:
-                    RgbData = bytearray()
-                    for I in range(0, len(TextureData), 2):
-                        R, G = TextureData[I:I+2]
-                        RgbData.extend([R, G, 0])
-                    return bytes(RgbData), 'RGB'
-                elif "R8" in FormatName or "R8Unorm" in FormatName:
-                    RgbData = bytearray()
-                    for R in TextureData:
-                        RgbData.extend([R, R, R])
-                    return bytes(RgbData), 'RGB'
-                elif "R16F" in FormatName or "R32F" in FormatName:
-                    RgbData = bytearray()
-                    for I in range(0, len(TextureData), 2 if "R16F" in FormatName else 4):
-                        R = TextureData[I]
-                        RgbData.extend([R, R, R])
-                    return bytes(RgbData), 'RGB'
-                elif "RG16F" in FormatName or "RG32F" in FormatName:
-                    RgbData = bytearray()
-                    Step = 4 if "RG16F" in FormatName else 8
-                    for I in range(0, len(TextureData), Step):
-                        R = TextureData[I]
-                        G = TextureData[I + (2 if "RG16F" in FormatName else 4)]
-                        RgbData.extend([R, G, 0])
-                    return bytes(RgbData), 'RGB'
-                elif "RGB16F" in FormatName or "RGB32F" in FormatName:
-                    RgbData = bytearray()
-                    Step = 6 if "RGB16F" in FormatName else 12
-                    for I in range(0, len(TextureData), Step):
-                        R = TextureData[I]
-                        G = TextureData[I + (2 if "RGB16F" in FormatName else 4)]
-                        B = TextureData[I + (4 if "RGB16F" in FormatName else 8)]
-                        RgbData.extend([R, G, B])
-                    return bytes(RgbData), 'RGB'
-                elif "RGBA16F" in FormatName or "RGBA32F" in FormatName:
-                    BgraData = bytearray()
-                    Step = 8 if "RGBA16F" in FormatName else 16
-                    for I in range(0, len(TextureData), Step):
-                        R = TextureData[I]
-                        G = TextureData[I + (2 if "RGBA16F" in FormatName else 4)]
-                        B = TextureData[I + (4 if "RGBA16F" in FormatName else 8)]
-                        A = TextureData[I + (6 if "RGBA16F" in FormatName else 12)]
-                        BgraData.extend([B, G, R, A])
-                    return bytes(BgraData), 'RGBA'
-    
-            elif TextureObj.IsPvrtc():
-                Is2Bpp = "2" in FormatName
-                RgbaData = texture2ddecoder.decode_pvrtc(TextureData, Width, Height, Is2Bpp)
-                BgraData = bytearray()
-                for I in range(0, len(RgbaData), 4):
-                    R, G, B, A = RgbaData[I:I+4]
-                    BgraData.extend([B, G, R, A])
-                return bytes(BgraData), 'RGBA'
-    
-            logging.error(f"Unsupported texture format: {FormatName}")
-            return None, None
-                
-        except Exception as E:
-            logging.error(f"Error decoding texture: {E}")
-            import traceback
-            traceback.print_exc()
-            return None, None
+            return Decoder(TextureData, TextureObj.Width, TextureObj.Height)
+        except (ValueError, struct.error):
+            logging.exception("Error decoding texture")
+            return None, None, None
+
+
+DefaultCacheDir = os.path.join(os.path.expanduser("~"), ".cache", "sctx")
+
+
+def StoreCachedTexture(CachePath, ImageData, Size, ImageMode, RawMode):
+    # Pass-through decoders hand back the whole texture data, trailing bytes included.
+    PixelBytes = memoryview(ImageData).cast("B")[:Size]
+    if len(PixelBytes) != Size:
+        return
+    
+    TempPath = f"{CachePath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(CachePath), exist_ok=True)
+        with open(TempPath, "wb") as F:
+            F.write(f"{ImageMode} {RawMode}\n".encode("ascii"))
+            F.write(PixelBytes)
+        os.replace(TempPath, CachePath)
+    except OSError as E:
+        logging.warning(f"Could not write decode cache entry {CachePath}: {E}")
+        if os.path.exists(TempPath):
+            os.remove(TempPath)
+
+
+def CacheKey(Ctx, TextureObj):
+    # Hashes the bytes as stored in the file, so the lookup needs no decompression.
+    Hasher = PayloadHash(TextureObj.Data or b"")
+    if Ctx.CompressedPayload is not None and not (TextureObj is Ctx.Texture and Ctx.PayloadOffset == Ctx.TextureDataOffset):
+        Hasher.update(Ctx.CompressedPayload)
+    Hasher.update(struct.pack("<IHH", int(TextureObj.PixelType), TextureObj.Width, TextureObj.Height))
+    return Hasher.hexdigest()
+
+
+def DecodeTextureCached(Ctx, TextureObj, CacheDir):
+    if not TextureObj.Data and Ctx.CompressedPayload is None:
+        return DecodeWithPayloadCheck(Ctx, TextureObj)
+    
+    CachePath = os.path.join(CacheDir, f"{CacheKey(Ctx, TextureObj)}.raw")
+    try:
+        with open(CachePath, "rb") as F:
+            ImageMode, RawMode = F.readline().decode("ascii").split()
+            ImageData = F.read()
+        if len(ImageData) == TextureObj.Width * TextureObj.Height * len(RawMode):
+            logging.info(f"Loaded decoded texture from cache: {CachePath}")
+            return ImageData, ImageMode, RawMode
+    except (OSError, ValueError):
+        pass
+    
+    ImageData, ImageMode, RawMode = DecodeWithPayloadCheck(Ctx, TextureObj)
+    if ImageData is not None:
+        StoreCachedTexture(CachePath, ImageData, TextureObj.Width * TextureObj.Height * len(RawMode), ImageMode, RawMode)
+    return ImageData, ImageMode, RawMode
+
+
+def DecodeWithPayloadCheck(Ctx, TextureObj, CacheDir=None):
+    if CacheDir:
+        return DecodeTextureCached(Ctx, TextureObj, CacheDir)
+    UseDecompressedPayload = Ctx.NeedsDecompressedPayload() and Ctx.GetDecompressedPayload() is not None
+    return Ctx.DecodeTexture(TextureObj, UseDecompressedPayload=UseDecompressedPayload)
+
+
+SaveOptions = {
+    "png": {"compress_level": 1, "optimize": False},
+    "webp": {"lossless": True, "exact": True, "method": 0},
+}
+
+SaveFormats = {Extension: Extension.upper() for Extension in SaveOptions}
+
+
+def OutputStem(InputPath):
+    BaseName = os.path.basename(InputPath)
+    if BaseName[-5:].lower() == ".sctx":
+        return BaseName[:-5]
+    return os.path.splitext(BaseName)[0]
+
+
+def GenerateOutputFilename(InputPath, OutputFormat="png"):
+    return f"{OutputStem(InputPath)}.{OutputFormat}"
+
+
+def CreateImage(TextureObj, ImageData, ImageMode, RawMode):
+    if isinstance(ImageData, np.ndarray) and ImageMode == RawMode:
+        return Image.fromarray(ImageData)
+    return Image.frombuffer(ImageMode, (TextureObj.Width, TextureObj.Height), ImageData, 'raw', RawMode, 0, 1)
+
+
+def DecodeSingleFile(InputFile, CacheDir=None):
+    Ctx = SCTX(InputFile)
+    
+    TextureToDecode = Ctx.Texture
+    if not TextureToDecode and Ctx.StreamingTexture:
+        TextureToDecode = Ctx.StreamingTexture
+        logging.info(f"[{InputFile}] Using streaming texture for decoding")
+    
+    if not TextureToDecode:
+        logging.error(f"[{InputFile}] No texture found in SCTX file")
+        return None, "No texture found"
+    
+    ImageData, ImageMode, RawMode = DecodeWithPayloadCheck(Ctx, TextureToDecode, CacheDir)
+    
+    if ImageData is None:
+        return None, "Failed to decode texture"
+    
+    return CreateImage(TextureToDecode, ImageData, ImageMode, RawMode), None
 
 
-def GenerateOutputFilename(InputPath):
-    BaseName = os.path.splitext(os.path.basename(InputPath))[0]
-    return f"{BaseName}.png"
+OutputBufferSize = 1 << 20
+
+
+class OutputArchive:
+    def __init__(self, Path: str) -> None:
+        self.File = open(Path, "wb", buffering=OutputBufferSize)
+        self.Tar = tarfile.open(fileobj=self.File, mode="w")
+        self.Lock = threading.Lock()
+    
+    def Add(self, Name: str, Data) -> None:
+        Info = tarfile.TarInfo(Name)
+        Info.size = len(Data)
+        Info.mtime = int(time.time())
+        with self.Lock:
+            self.Tar.addfile(Info, io.BytesIO(Data))
+    
+    def Close(self) -> None:
+        self.Tar.close()
+        self.File.close()
+
+
+def QuantizeImage(ImageObj):
+    return ImageObj.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+
+
+def EncodeImage(ImageObj, OutputFormat):
+    Buffer = io.BytesIO()
+    ImageObj.save(Buffer, format=SaveFormats[OutputFormat], **SaveOptions[OutputFormat])
+    return Buffer.getvalue()
+
+
+def SaveSingleFile(InputFile, ImageObj, OutputFile, OutputFormat, Archive=None, Palette=False):
+    try:
+        if Palette:
+            ImageObj = QuantizeImage(ImageObj)
+        if Archive is not None:
+            Archive.Add(OutputFile, EncodeImage(ImageObj, OutputFormat))
+        else:
+            with open(OutputFile, "wb", buffering=OutputBufferSize) as F:
+                ImageObj.save(F, format=SaveFormats[OutputFormat], **SaveOptions[OutputFormat])
+        return True, InputFile, OutputFile
+    except Exception as E:
+        return False, InputFile, str(E)
 
 
 def ProcessSingleFile(Args):
    
-    InputFile, OutputFile = Args
+    InputFile, OutputFile, OutputFormat, CacheDir, Palette = Args
     try:
-        Ctx = SCTX(InputFile)
-        
-        TextureToDecode = Ctx.Texture
-        if not TextureToDecode and Ctx.StreamingTexture:
-            TextureToDecode = Ctx.StreamingTexture
-            logging.info(f"[{InputFile}] Using streaming texture for decoding")
+        ImageObj, Error = DecodeSingleFile(InputFile, CacheDir)
+    except Exception as E:
+        return False, InputFile, str(E)
+    
+    if ImageObj is None:
+        return False, InputFile, Error
+    return SaveSingleFile(InputFile, ImageObj, OutputFile, OutputFormat, Palette=Palette)
+
+
+def PackSingleFile(Args):
+    # Runs in a worker process: the encoded bytes go back to the parent, which owns the archive.
+    InputFile, OutputFile, OutputFormat, CacheDir, Palette = Args
+    try:
+        ImageObj, Error = DecodeSingleFile(InputFile, CacheDir)
+        if ImageObj is None:
+            return (False, InputFile, Error), None
+        if Palette:
+            ImageObj = QuantizeImage(ImageObj)
+        return (True, InputFile, OutputFile), EncodeImage(ImageObj, OutputFormat)
+    except Exception as E:
+        return (False, InputFile, str(E)), None
+
+
+def PrefetchFile(Path):
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        Fd = os.open(Path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(Fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(Fd)
+
+
+def PrefetchAhead(Tasks, Results, Lookahead):
+    # Worker results come back in task order; each one that arrives frees a slot, so
+    # hint the input Lookahead positions further on while the workers are busy.
+    for Task in Tasks[:Lookahead]:
+        PrefetchFile(Task[0])
+    for Index, Result in enumerate(Results):
+        if Index + Lookahead < len(Tasks):
+            PrefetchFile(Tasks[Index + Lookahead][0])
+        yield Result
+
+
+def ProcessPipelined(Tasks, NumCores, Archive=None):
+    # Decode and PNG encoding run on separate pools so one file's save overlaps the
+    # next file's decode; the semaphore bounds how many decoded images wait to be saved.
+    PendingImages = threading.BoundedSemaphore(NumCores * 2)
+    
+    def Decode(Index):
+        # Start reading the file that runs after the ones in flight now, so its
+        # disk I/O overlaps this file's decode.
+        if Index + NumCores < len(Tasks):
+            PrefetchFile(Tasks[Index + NumCores][0])
+        PendingImages.acquire()
+        try:
+            ImageObj, Error = DecodeSingleFile(Tasks[Index][0], Tasks[Index][3])
+        except Exception as E:
+            ImageObj, Error = None, str(E)
+        if ImageObj is None:
+            PendingImages.release()
+        return ImageObj, Error
+    
+    def Save(InputFile, ImageObj, OutputFile, OutputFormat, Palette):
+        try:
+            return SaveSingleFile(InputFile, ImageObj, OutputFile, OutputFormat, Archive, Palette)
+        finally:
+            PendingImages.release()
+    
+    for Task in Tasks[:NumCores]:
+        PrefetchFile(Task[0])
+    
+    Results = [None] * len(Tasks)
+    with ThreadPoolExecutor(max_workers=NumCores) as DecodePool, ThreadPoolExecutor(max_workers=NumCores) as SavePool:
+        Decoding = {DecodePool.submit(Decode, Index): Index for Index in range(len(Tasks))}
+        Saving = {}
         
-        if not TextureToDecode:
-            logging.error(f"[{InputFile}] No texture found in SCTX file")
-            return False, InputFile, "No texture found"
+        for Future in as_completed(Decoding):
+            Index = Decoding[Future]
+            InputFile, OutputFile, OutputFormat, _, Palette = Tasks[Index]
+            ImageObj, Error = Future.result()
+            if ImageObj is None:
+                Results[Index] = (False, InputFile, Error)
+            else:
+                Saving[SavePool.submit(Save, InputFile, ImageObj, OutputFile, OutputFormat, Palette)] = Index
         
-        ImageData, ImageMode = Ctx.DecodeTexture(TextureToDecode, UseDecompressedPayload=False)
+        for Future, Index in Saving.items():
+            Results[Index] = Future.result()
+    
+    return Results
 
-        if not ImageData and Ctx.DecompressedPayload:
-            logging.info(f"[{InputFile}] Retrying with decompressed payload...")
-            ImageData, ImageMode = Ctx.DecodeTexture(TextureToDecode, UseDecompressedPayload=True)
-        
-        if ImageData:
-            ImageObj = Image.frombytes(ImageMode, (TextureToDecode.Width, TextureToDecode.Height), ImageData)
-            ImageObj.save(OutputFile)
-            return True, InputFile, OutputFile
-        else:
-            return False, InputFile, "Failed to decode texture"
-            
-    except Exception as E:
-        return False, InputFile, str(E)
 
+WorkerPool = None
 
-def ProcessBatchFiles(InputFiles, OutputDir=None):
+
+def GetWorkerPool():
+    # Kept for the life of the interpreter so repeated batches reuse warm workers
+    # instead of paying process startup and imports each time.
+    global WorkerPool
+    if WorkerPool is None:
+        WorkerPool = ProcessPoolExecutor(max_workers=cpu_count())
+        atexit.register(WorkerPool.shutdown)
+    return WorkerPool
+
+
+def ProcessBatchFiles(InputFiles, OutputDir=None, Backend="process", OutputFormat="png", Pack=False, CacheDir=None, Palette=False):
     
     NumCores = cpu_count()
-    logging.info(f"Using {NumCores} CPU cores for parallel processing")
-    
-    Tasks = []
-    for InputFile in InputFiles:
-        if OutputDir:
-            os.makedirs(OutputDir, exist_ok=True)
-            BaseName = os.path.splitext(os.path.basename(InputFile))[0]
-            OutputFile = os.path.join(OutputDir, f"{BaseName}.png")
-        else:
-            OutputFile = GenerateOutputFilename(InputFile)
-        Tasks.append((InputFile, OutputFile))
+    logging.info(f"Using {NumCores} CPU cores for parallel processing ({Backend} backend)")
+    
+    OutputPrefix = ""
+    if OutputDir and not Pack:
+        os.makedirs(OutputDir, exist_ok=True)
+        OutputPrefix = os.path.join(OutputDir, "")
+    Suffix = f".{OutputFormat}"
+    Tasks = [(InputFile, OutputPrefix + OutputStem(InputFile) + Suffix, OutputFormat, CacheDir, Palette) for InputFile in InputFiles]
     
     SuccessCount = 0
     FailCount = 0
     
-    with Pool(processes=NumCores) as Pool_:
-        Results = Pool_.map(ProcessSingleFile, Tasks)
+    Archive = None
+    if Pack:
+        ArchivePath = OutputDir or "Output.tar"
+        if os.path.isdir(ArchivePath):
+            ArchivePath = os.path.join(ArchivePath, "Output.tar")
+        Archive = OutputArchive(ArchivePath)
+    
+    # Small chunks keep the largest-first order spread over all workers.
+    ChunkSize = max(1, len(Tasks) // (NumCores * 4))
+    # Covers the chunks in flight plus one more round, so workers never wait on disk.
+    Lookahead = NumCores * ChunkSize * 2
+    
+    try:
+        if Backend == "process" and Archive is not None:
+            Results = []
+            for Result, Payload in PrefetchAhead(Tasks, GetWorkerPool().map(PackSingleFile, Tasks, chunksize=ChunkSize), Lookahead):
+                if Payload is not None:
+                    Archive.Add(Result[2], Payload)
+                Results.append(Result)
+        elif Backend == "process":
+            Results = list(PrefetchAhead(Tasks, GetWorkerPool().map(ProcessSingleFile, Tasks, chunksize=ChunkSize), Lookahead))
+        else:
+            Results = ProcessPipelined(Tasks, NumCores, Archive)
+    finally:
+        if Archive is not None:
+            Archive.Close()
+            logging.info(f"Packed outputs into {ArchivePath}")
         
-        for Success, InputFile, Message in Results:
-            if Success:
-                print(f"✓ {InputFile} -> {Message}")
-                SuccessCount += 1
-            else:
-                print(f"✗ {InputFile}: {Message}")
-                FailCount += 1
+    for Success, InputFile, Message in Results:
+        if Success:
+            print(f"✓ {InputFile} -> {Message}")
+            SuccessCount += 1
+        else:
+            print(f"✗ {InputFile}: {Message}")
+            FailCount += 1
     
     print(f"\nProcessing complete: {SuccessCount} succeeded, {FailCount} failed")
     return SuccessCount, FailCount
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-       
-        print("Single file: python SctxDecode.py <Input.sctx> [Output.png]")
-        print("Batch mode:  python SctxDecode.py <Input1.sctx> <Input2.sctx> -o <OutputDir>")
-        print("Directory:   python SctxDecode.py <InputDir> -o <OutputDir>")
-        sys.exit(1)
+ArgParser = argparse.ArgumentParser(
+    prog="SctxDecode.py",
+    description="Decode Supercell SCTX textures to images.",
+    usage="""
+  Single file: %(prog)s <Input.sctx> [Output.png] [options]
+  Batch mode:  %(prog)s <Input1.sctx> <Input2.sctx> ... -o <OutputDir> [options]
+  Directory:   %(prog)s <InputDir> -o <OutputDir> [options]""",
+)
+ArgParser.add_argument("inputs", nargs="+", metavar="input", help="SCTX files or directories; in single-file mode an optional output path may follow")
+ArgParser.add_argument("-o", "--output", default=None, help="output directory, or the tar archive path with --pack")
+ArgParser.add_argument("--backend", choices=("process", "thread"), default="process", help="batch worker type")
+ArgParser.add_argument("--format", choices=tuple(SaveOptions), default="png", help="output image format")
+ArgParser.add_argument("--pack", action="store_true", help="write batch outputs into a single tar archive")
+ArgParser.add_argument("--cache", action="store_true", help=f"cache decoded pixels in {DefaultCacheDir}")
+ArgParser.add_argument("--palette", action="store_true", help="quantize to a 256-colour palette before saving")
+
+
+def CollectInputFiles(Paths):
+    SizedFiles = []
+    for Path in Paths:
+        if os.path.isdir(Path):
+            with os.scandir(Path) as Entries:
+                SizedFiles.extend((Entry.stat().st_size, Entry.path) for Entry in Entries
+                                  if Entry.name[-5:].lower() == '.sctx' and Entry.is_file())
+        elif os.path.exists(Path):
+            SizedFiles.append((os.path.getsize(Path), Path))
     
+    # Largest textures first so no worker is left decoding a big one at the end.
+    SizedFiles.sort(key=lambda Item: Item[0], reverse=True)
+    return [Path for _, Path in SizedFiles]
+
+
+if __name__ == "__main__":
+    Args = ArgParser.parse_args()
+    OutputFormat = Args.format
+    Palette = Args.palette
+    CacheDir = DefaultCacheDir if Args.cache else None
     
-    if len(sys.argv) > 3 or (len(sys.argv) == 3 and sys.argv[2] == '-o'):
-        
-        InputFiles = []
-        OutputDir = None
-        
-        if os.path.isdir(sys.argv[1]):
-            
-            InputDir = sys.argv[1]
-            InputFiles = [os.path.join(InputDir, f) for f in os.listdir(InputDir) 
-                         if f.lower().endswith('.sctx')]
-            if '-o' in sys.argv:
-                OutputDir = sys.argv[sys.argv.index('-o') + 1]
-        else:
-           
-            for Arg in sys.argv[1:]:
-                if Arg == '-o':
-                    break
-                if os.path.exists(Arg):
-                    InputFiles.append(Arg)
-            
-            if '-o' in sys.argv:
-                OutputDir = sys.argv[sys.argv.index('-o') + 1]
+    if Args.output is not None or len(Args.inputs) > 2 or os.path.isdir(Args.inputs[0]):
         
+        InputFiles = CollectInputFiles(Args.inputs)
         if not InputFiles:
             logging.error("No valid input files found")
             sys.exit(1)
         
-        ProcessBatchFiles(InputFiles, OutputDir)
+        ProcessBatchFiles(InputFiles, Args.output, Args.backend, OutputFormat, Args.pack, CacheDir, Palette)
     
     else:
         
-        InputFile = sys.argv[1]
-        OutputFile = sys.argv[2] if len(sys.argv) > 2 else GenerateOutputFilename(InputFile)
+        InputFile = Args.inputs[0]
+        OutputFile = Args.inputs[1] if len(Args.inputs) > 1 else GenerateOutputFilename(InputFile, OutputFormat)
         
         if not os.path.exists(InputFile):
             logging.error(f"File not found: {InputFile}")
@@ -779,34 +1110,46 @@ if __name__ == "__main__":
         
         try:
             Ctx = SCTX(InputFile)
-            
-            Ctx.LogInfo()
-            
-            TextureToDecode = Ctx.Texture
-            if not TextureToDecode and Ctx.StreamingTexture:
-                TextureToDecode = Ctx.StreamingTexture
-                logging.info("Using streaming texture for decoding")
-            
-            if not TextureToDecode:
-                logging.error("No texture found in SCTX file")
-                sys.exit(1)
-            
-            ImageData, ImageMode = Ctx.DecodeTexture(TextureToDecode, UseDecompressedPayload=False)
+        except (OSError, SCTXParseError):
+            logging.exception(f"Error reading file: {InputFile}")
+            sys.exit(1)
+        
+        Ctx.LogInfo()
+        
+        TextureToDecode = Ctx.Texture
+        if not TextureToDecode and Ctx.StreamingTexture:
+            TextureToDecode = Ctx.StreamingTexture
+            logging.info("Using streaming texture for decoding")
+        
+        if not TextureToDecode:
+            logging.error("No texture found in SCTX file")
+            sys.exit(1)
+        
+        try:
+            ImageData, ImageMode, RawMode = DecodeWithPayloadCheck(Ctx, TextureToDecode, CacheDir)
+        except (OSError, ValueError, RuntimeError, struct.error, zstandard.ZstdError):
+            logging.exception(f"Error decoding texture: {InputFile}")
+            sys.exit(1)
+        
+        if ImageData is None:
+            logging.error("Failed to decode texture")
+            sys.exit(1)
+        
+        try:
+            ImageObj = CreateImage(TextureToDecode, ImageData, ImageMode, RawMode)
+            if Palette:
+                ImageObj = QuantizeImage(ImageObj)
+        except ValueError as E:
+            logging.error(f"Failed to decode texture: {E}")
+            sys.exit(1)
 
-            if not ImageData and Ctx.DecompressedPayload:
-                logging.info("Retrying with decompressed payload...")
-                ImageData, ImageMode = Ctx.DecodeTexture(TextureToDecode, UseDecompressedPayload=True)
-            
-            if ImageData:
-                ImageObj = Image.frombytes(ImageMode, (TextureToDecode.Width, TextureToDecode.Height), ImageData)
-                ImageObj.save(OutputFile)
-                print(f"Output: {OutputFile}")
+        FileFormat = os.path.splitext(OutputFile)[1][1:].lower()
+        try:
+            if FileFormat in SaveFormats:
+                ImageObj.save(OutputFile, format=SaveFormats[FileFormat], **SaveOptions[FileFormat])
             else:
-                logging.error("Failed to decode texture")
-                sys.exit(1)
-                
-        except Exception as E:
-            logging.error(f"Error processing file: {E}")
-            import traceback
-            traceback.print_exc()
-            sys.exit(1)
\ No newline at end of file
+                ImageObj.save(OutputFile)
+        except (OSError, ValueError):
+            logging.exception(f"Error saving image: {OutputFile}")
+            sys.exit(1)
+        print(f"Output: {OutputFile}")